@@ -2,12 +2,198 @@
 Analyzer module to run corpus_dedup_runner.py and parse results.
 """
 
-import subprocess
+import os
+import sys
 import json
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache, partial
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any
+import numpy as np
 import pandas as pd
-from collections import defaultdict
+
+# The runner lives in the project root (parent of backend/); it is imported
+# in-process and executed in a warm worker process (see _get_executor).
+ROOT_DIR = Path(__file__).parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+import corpus_dedup_runner
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:
+    # Optional: pandas' own CSV parser is used instead
+    pa = None
+
+# CSVs written by corpus_dedup_runner that get a Parquet sidecar after each run
+RESULT_FILES = (
+    "exact_sentence_pairs.csv",
+    "simhash_sentence_pairs.csv",
+    "simhash_sentence_pairs_strict.csv",
+    "embed_sentence_pairs.csv",
+    "embed_sentence_pairs_strict.csv",
+    "block_matches.csv",
+    "doc_metrics.csv",
+)
+
+# Low-cardinality string columns, dictionary-encoded (categorical) when parsed with pyarrow
+DICTIONARY_COLUMNS = ("docA", "docB", "category")
+
+
+def _read_csv_arrow(path_str: str, columns: Optional[Tuple[str, ...]] = None) -> pd.DataFrame:
+    """Parse a CSV with pyarrow's multithreaded reader."""
+    dict_type = pa.dictionary(pa.int32(), pa.string())
+    table = pacsv.read_csv(
+        path_str,
+        read_options=pacsv.ReadOptions(use_threads=True),
+        convert_options=pacsv.ConvertOptions(
+            column_types={col: dict_type for col in DICTIONARY_COLUMNS},
+            include_columns=list(columns) if columns else None
+        )
+    )
+    return table.to_pandas()
+
+
+@lru_cache(maxsize=16)
+def _read_parquet_cached(path_str: str, mtime: int, columns: Optional[Tuple[str, ...]] = None) -> pd.DataFrame:
+    """Parquet counterpart of _read_csv_cached (same caching and sharing rules)."""
+    return pd.read_parquet(path_str, columns=list(columns) if columns else None)
+
+
+@lru_cache(maxsize=16)
+def _read_csv_cached(path_str: str, mtime: int, columns: Optional[Tuple[str, ...]] = None) -> pd.DataFrame:
+    """
+    Parse a result CSV once per (path, mtime, columns).
+    
+    The mtime is part of the key so a rewritten file is reparsed automatically.
+    Passing columns parses only those (skipping the bulky text columns).
+    The returned DataFrame is shared between callers and must not be mutated.
+    """
+    return _read_csv(path_str, columns)
+
+
+def _read_csv(path_str: str, columns: Optional[Tuple[str, ...]] = None) -> pd.DataFrame:
+    """Parse a result CSV (pyarrow when available, else pandas); empty if the file has no data."""
+    if pa is not None:
+        try:
+            return _read_csv_arrow(path_str, columns)
+        except pa.ArrowInvalid:
+            # e.g. a file without a header row; let pandas handle it
+            pass
+    try:
+        if columns:
+            return pd.read_csv(
+                path_str,
+                usecols=list(columns),
+                dtype={col: 'category' for col in columns if col in DICTIONARY_COLUMNS}
+            )
+        return pd.read_csv(path_str)
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame()
+
+
+def _pair_matches(
+    df: pd.DataFrame,
+    doc_name: str,
+    match_type: str,
+    extra_cols: Tuple[str, ...] = ()
+) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+    """
+    Select the sentence pairs touching doc_name, oriented so doc_name is the "own" side.
+    
+    Returns:
+        (match records in file order, sentence IDs of doc_name involved)
+    """
+    if df.empty:
+        return [], np.empty(0, dtype=np.int64)
+    
+    m_a = df['docA'].values == doc_name
+    m_b = ~m_a & (df['docB'].values == doc_name)
+    rows = m_a | m_b
+    sub = df.loc[rows]
+    a_side = m_a[rows]
+    
+    matches = pd.DataFrame({
+        "other_doc": np.where(a_side, sub['docB'].values, sub['docA'].values),
+        "sent_id": np.where(a_side, sub['sentA_id'].values, sub['sentB_id'].values),
+        "other_sent_id": np.where(a_side, sub['sentB_id'].values, sub['sentA_id'].values),
+        "text": np.where(a_side, sub['textA'].values, sub['textB'].values),
+        "other_text": np.where(a_side, sub['textB'].values, sub['textA'].values)
+    })
+    for col in extra_cols:
+        matches[col] = sub[col].values
+    matches["type"] = match_type
+    matches["category"] = sub['category'].values if 'category' in sub else 'cross-document'
+    
+    return matches.to_dict('records'), matches['sent_id'].values
+
+
+def _count_partners(df: pd.DataFrame, doc_name: str) -> pd.Series:
+    """Count pairs linking doc_name to each other document (within-document pairs excluded)."""
+    if df.empty:
+        return pd.Series(dtype='int64')
+    
+    m_a = df['docA'].values == doc_name
+    m_b = df['docB'].values == doc_name
+    other = np.where(m_a, df['docB'].values, df['docA'].values)[m_a ^ m_b]
+    return pd.Series(other).value_counts(sort=False)
+
+
+def _duplicate_sentence_ids(sent_ids: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> List[int]:
+    """
+    Sorted union of single sentence IDs and inclusive [start, end] block ranges.
+    
+    Uses a boolean bitmap over the (small, per-document) ID space: ranges are
+    marked with a +1/-1 difference array and a cumulative sum, no hashing.
+    """
+    size = max(
+        int(sent_ids.max()) + 1 if len(sent_ids) else 0,
+        int(ends.max()) + 1 if len(ends) else 0
+    )
+    if size == 0:
+        return []
+    
+    edges = np.zeros(size + 1, dtype=np.int64)
+    np.add.at(edges, starts, 1)
+    np.add.at(edges, ends + 1, -1)
+    bitmap = np.cumsum(edges[:-1]) > 0
+    bitmap[sent_ids] = True
+    return np.flatnonzero(bitmap).tolist()
+
+
+def _positions_by_doc(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Map each document to the sorted row positions where it appears as docA or docB."""
+    if df.empty:
+        return {}
+    
+    by_a = df.groupby('docA', sort=False, observed=True).indices
+    by_b = df.groupby('docB', sort=False, observed=True).indices
+    none = np.empty(0, dtype=np.intp)
+    return {
+        doc: np.union1d(by_a.get(doc, none), by_b.get(doc, none))
+        for doc in by_a.keys() | by_b.keys()
+    }
+
+
+class _PreparedIndex:
+    """Result tables grouped by document once, so per-document lookups skip full scans."""
+    
+    def __init__(self, tables: Dict[str, pd.DataFrame]):
+        self.tables = tables
+        self.positions = {name: _positions_by_doc(df) for name, df in tables.items()}
+    
+    def rows_for(self, name: str, doc_name: str) -> pd.DataFrame:
+        """Rows of table `name` that involve doc_name, in file order."""
+        df = self.tables[name]
+        positions = self.positions[name].get(doc_name)
+        if positions is None:
+            return df.iloc[0:0]
+        return df.iloc[positions]
 
 
 class DuplicateAnalyzer:
@@ -15,72 +201,77 @@ class DuplicateAnalyzer:
     
     def __init__(self, docs_dir: str = "docs", output_dir: str = "dedup_out"):
         # Get paths relative to the project root (parent of backend/)
-        root_dir = Path(__file__).parent.parent
-        self.docs_dir = root_dir / docs_dir
-        self.output_dir = root_dir / output_dir
-        self.runner_script = root_dir / "corpus_dedup_runner.py"
+        self.docs_dir = ROOT_DIR / docs_dir
+        self.output_dir = ROOT_DIR / output_dir
+        self._index: Optional[_PreparedIndex] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._index_key: Optional[int] = None
         
-    def run_analysis(self, use_embeddings: bool = False, **kwargs) -> Dict[str, Any]:
+    def _get_executor(self) -> ProcessPoolExecutor:
         """
-        Run the corpus_dedup_runner.py script.
+        Single long-lived worker process for analyses.
+        
+        The pipeline is CPU-bound Python; running it in its own process keeps it
+        from competing for the GIL with request handling, while imports (and any
+        loaded embedding model) stay warm between runs. The worker is spawned, not
+        forked: the server process has live threads (anyio, pyarrow) whose held locks
+        a forked child could inherit and deadlock on.
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+    
+    async def run_analysis_async(self, use_embeddings: bool = False, **kwargs) -> Dict[str, Any]:
+        """
+        Run the corpus_dedup_runner pipeline in the worker process without blocking the event loop.
         
         Args:
             use_embeddings: Whether to use embeddings for semantic matching
-            **kwargs: Additional arguments to pass to the runner
+            **kwargs: Additional runner options (same names as the CLI flags)
             
         Returns:
             Dict with status and summary
         """
-        if not self.runner_script.exists():
-            raise FileNotFoundError(f"Runner script not found: {self.runner_script}")
-        
         if not self.docs_dir.exists():
             raise FileNotFoundError(f"Docs directory not found: {self.docs_dir}")
         
-        # Build command
-        cmd = [
-            "python",
-            str(self.runner_script),
-            "--input_dir", str(self.docs_dir),
-            "--out_dir", str(self.output_dir)
-        ]
-        
-        if use_embeddings:
-            cmd.append("--use_embeddings")
-        
-        # Add optional parameters
-        for key, value in kwargs.items():
-            cmd.extend([f"--{key}", str(value)])
-        
-        # Run the analysis
+        loop = asyncio.get_running_loop()
         try:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=300  # 5 minute timeout
+            summary = await loop.run_in_executor(
+                self._get_executor(),
+                partial(
+                    corpus_dedup_runner.run,
+                    str(self.docs_dir),
+                    str(self.output_dir),
+                    use_embeddings=use_embeddings,
+                    **kwargs
+                )
             )
             
-            if result.returncode != 0:
+            if summary is None:
                 return {
                     "success": False,
-                    "error": result.stderr,
-                    "stdout": result.stdout
+                    "error": f"No .docx files found in {self.docs_dir}"
                 }
             
-            # Load summary
-            summary = self.get_summary()
+            try:
+                # CSV parsing and Parquet writing are blocking; keep them off the event loop
+                await loop.run_in_executor(None, self._materialize_parquet)
+            except ImportError:
+                # No Parquet engine installed; loaders keep reading the CSVs
+                pass
             
             return {
                 "success": True,
-                "summary": summary,
-                "stdout": result.stdout
+                "summary": summary
             }
             
-        except subprocess.TimeoutExpired:
+        except BrokenProcessPool:
+            # The worker died (e.g. out of memory); start a fresh one next time
+            self._executor = None
             return {
                 "success": False,
-                "error": "Analysis timed out after 5 minutes"
+                "error": "Analysis worker process terminated unexpectedly"
             }
         except Exception as e:
             return {
@@ -88,6 +279,10 @@ class DuplicateAnalyzer:
                 "error": str(e)
             }
     
+    def run_analysis(self, use_embeddings: bool = False, **kwargs) -> Dict[str, Any]:
+        """Blocking wrapper around run_analysis_async for scripts and non-async callers."""
+        return asyncio.run(self.run_analysis_async(use_embeddings=use_embeddings, **kwargs))
+    
     def has_results(self) -> bool:
         """Check if analysis results exist."""
         summary_file = self.output_dir / "summary.json"
@@ -102,19 +297,85 @@ class DuplicateAnalyzer:
         with open(summary_file, 'r') as f:
             return json.load(f)
     
+    def _load_result(self, filename: str, columns: Optional[Tuple[str, ...]] = None) -> pd.DataFrame:
+        """
+        Load a result CSV through the mtime-keyed cache (empty if missing).
+        
+        A Parquet sidecar written by _materialize_parquet is preferred when it is
+        at least as new as the CSV. `columns` restricts the load to those columns.
+        """
+        file_path = self.output_dir / filename
+        try:
+            mtime = file_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return pd.DataFrame()
+        
+        parquet_path = file_path.with_suffix(".parquet")
+        try:
+            parquet_mtime = parquet_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            parquet_mtime = -1
+        if parquet_mtime >= mtime:
+            return _read_parquet_cached(str(parquet_path), parquet_mtime, columns)
+        
+        return _read_csv_cached(str(file_path), mtime, columns)
+    
+    def _materialize_parquet(self):
+        """
+        Write a Parquet copy of every result CSV and drop sidecars whose CSV is gone.
+        
+        CSVs are parsed outside the read cache (the sidecar replaces them for later
+        loads), and each sidecar is written to a temp file and renamed into place so
+        concurrent readers never see a partially written Parquet file.
+        """
+        for filename in RESULT_FILES:
+            csv_path = self.output_dir / filename
+            parquet_path = csv_path.with_suffix(".parquet")
+            if csv_path.exists():
+                tmp_path = parquet_path.with_name(parquet_path.name + ".tmp")
+                try:
+                    _read_csv(str(csv_path)).to_parquet(tmp_path, compression="zstd")
+                    os.replace(tmp_path, parquet_path)
+                finally:
+                    if tmp_path.exists():
+                        tmp_path.unlink()
+            elif parquet_path.exists():
+                parquet_path.unlink()
+    
+    def _metrics_df(self) -> pd.DataFrame:
+        return self._load_result("doc_metrics.csv")
+    
+    def _exact_df(self) -> pd.DataFrame:
+        return self._load_result("exact_sentence_pairs.csv")
+    
+    def _simhash_df(self, strict: bool = False) -> pd.DataFrame:
+        return self._load_result("simhash_sentence_pairs_strict.csv" if strict else "simhash_sentence_pairs.csv")
+    
+    def _embedding_df(self, strict: bool = False) -> pd.DataFrame:
+        return self._load_result("embed_sentence_pairs_strict.csv" if strict else "embed_sentence_pairs.csv")
+    
+    def _block_df(self) -> pd.DataFrame:
+        return self._load_result("block_matches.csv")
+    
+    def _pair_docs_dfs(self) -> List[pd.DataFrame]:
+        """Only the (docA, docB) columns of the exact, SimHash and embedding pair files."""
+        columns = ('docA', 'docB')
+        return [
+            self._load_result(filename, columns)
+            for filename in ("exact_sentence_pairs.csv", "simhash_sentence_pairs.csv", "embed_sentence_pairs.csv")
+        ]
+    
     def get_doc_metrics(self) -> List[Dict[str, Any]]:
         """Load document metrics with similarity scores."""
-        metrics_file = self.output_dir / "doc_metrics.csv"
-        if not metrics_file.exists():
+        df = self._metrics_df()
+        if df.empty:
             return []
         
-        df = pd.read_csv(metrics_file)
-        
-        # Calculate aggregate similarity score
-        df['similarity_score'] = (
+        # Calculate aggregate similarity score (assign copies, the cached frame stays untouched)
+        df = df.assign(similarity_score=(
             df['matched_sentences_pct'] * 0.6 + 
             df['in_block_sentences_pct'] * 0.4
-        )
+        ))
         
         # Sort by similarity score descending
         df = df.sort_values('similarity_score', ascending=False)
@@ -123,41 +384,37 @@ class DuplicateAnalyzer:
     
     def get_exact_pairs(self) -> List[Dict[str, Any]]:
         """Load exact sentence pairs."""
-        file_path = self.output_dir / "exact_sentence_pairs.csv"
-        if not file_path.exists():
-            return []
-        
-        df = pd.read_csv(file_path)
-        return df.to_dict('records')
+        return self._exact_df().to_dict('records')
     
     def get_simhash_pairs(self, strict: bool = False) -> List[Dict[str, Any]]:
         """Load SimHash sentence pairs."""
-        filename = "simhash_sentence_pairs_strict.csv" if strict else "simhash_sentence_pairs.csv"
-        file_path = self.output_dir / filename
-        if not file_path.exists():
-            return []
-        
-        df = pd.read_csv(file_path)
-        return df.to_dict('records')
+        return self._simhash_df(strict).to_dict('records')
     
     def get_embedding_pairs(self, strict: bool = False) -> List[Dict[str, Any]]:
         """Load embedding sentence pairs."""
-        filename = "embed_sentence_pairs_strict.csv" if strict else "embed_sentence_pairs.csv"
-        file_path = self.output_dir / filename
-        if not file_path.exists():
-            return []
-        
-        df = pd.read_csv(file_path)
-        return df.to_dict('records')
+        return self._embedding_df(strict).to_dict('records')
     
     def get_block_matches(self) -> List[Dict[str, Any]]:
         """Load block matches."""
-        file_path = self.output_dir / "block_matches.csv"
-        if not file_path.exists():
-            return []
+        return self._block_df().to_dict('records')
+    
+    def prepare_all(self) -> _PreparedIndex:
+        """
+        Load the pair and block tables once and index their rows by document.
         
-        df = pd.read_csv(file_path)
-        return df.to_dict('records')
+        The index is rebuilt when summary.json changes, i.e. after a new analysis.
+        """
+        summary_file = self.output_dir / "summary.json"
+        key = summary_file.stat().st_mtime_ns if summary_file.exists() else None
+        if self._index is None or self._index_key != key:
+            self._index = _PreparedIndex({
+                "exact": self._exact_df(),
+                "simhash": self._simhash_df(),
+                "embedding": self._embedding_df(),
+                "blocks": self._block_df()
+            })
+            self._index_key = key
+        return self._index
     
     def get_duplicates_for_doc(self, doc_name: str) -> Dict[str, Any]:
         """
@@ -169,127 +426,48 @@ class DuplicateAnalyzer:
                 "simhash": List of simhash matches,
                 "embedding": List of embedding matches,
                 "blocks": List of block matches,
-                "duplicate_sentences": Set of sentence IDs that are duplicates
+                "duplicate_sentences": Sorted list of sentence IDs that are duplicates
             }
         """
-        result = {
-            "exact": [],
-            "simhash": [],
-            "embedding": [],
-            "blocks": [],
-            "duplicate_sentences": set()
-        }
-        
-        # Exact pairs
-        for pair in self.get_exact_pairs():
-            if pair['docA'] == doc_name:
-                result["exact"].append({
-                    "other_doc": pair['docB'],
-                    "sent_id": pair['sentA_id'],
-                    "other_sent_id": pair['sentB_id'],
-                    "text": pair['textA'],
-                    "other_text": pair['textB'],
-                    "type": "exact",
-                    "category": pair.get('category', 'cross-document')
-                })
-                result["duplicate_sentences"].add(pair['sentA_id'])
-            elif pair['docB'] == doc_name:
-                result["exact"].append({
-                    "other_doc": pair['docA'],
-                    "sent_id": pair['sentB_id'],
-                    "other_sent_id": pair['sentA_id'],
-                    "text": pair['textB'],
-                    "other_text": pair['textA'],
-                    "type": "exact",
-                    "category": pair.get('category', 'cross-document')
-                })
-                result["duplicate_sentences"].add(pair['sentB_id'])
-        
-        # SimHash pairs
-        for pair in self.get_simhash_pairs():
-            if pair['docA'] == doc_name:
-                result["simhash"].append({
-                    "other_doc": pair['docB'],
-                    "sent_id": pair['sentA_id'],
-                    "other_sent_id": pair['sentB_id'],
-                    "text": pair['textA'],
-                    "other_text": pair['textB'],
-                    "hamming": pair['hamming'],
-                    "type": "simhash",
-                    "category": pair.get('category', 'cross-document')
-                })
-                result["duplicate_sentences"].add(pair['sentA_id'])
-            elif pair['docB'] == doc_name:
-                result["simhash"].append({
-                    "other_doc": pair['docA'],
-                    "sent_id": pair['sentB_id'],
-                    "other_sent_id": pair['sentA_id'],
-                    "text": pair['textB'],
-                    "other_text": pair['textA'],
-                    "hamming": pair['hamming'],
-                    "type": "simhash",
-                    "category": pair.get('category', 'cross-document')
-                })
-                result["duplicate_sentences"].add(pair['sentB_id'])
-        
-        # Embedding pairs
-        for pair in self.get_embedding_pairs():
-            if pair['docA'] == doc_name:
-                result["embedding"].append({
-                    "other_doc": pair['docB'],
-                    "sent_id": pair['sentA_id'],
-                    "other_sent_id": pair['sentB_id'],
-                    "text": pair['textA'],
-                    "other_text": pair['textB'],
-                    "cosine": pair['cosine'],
-                    "type": "embedding",
-                    "category": pair.get('category', 'cross-document')
-                })
-                result["duplicate_sentences"].add(pair['sentA_id'])
-            elif pair['docB'] == doc_name:
-                result["embedding"].append({
-                    "other_doc": pair['docA'],
-                    "sent_id": pair['sentB_id'],
-                    "other_sent_id": pair['sentA_id'],
-                    "text": pair['textB'],
-                    "other_text": pair['textA'],
-                    "cosine": pair['cosine'],
-                    "type": "embedding",
-                    "category": pair.get('category', 'cross-document')
-                })
-                result["duplicate_sentences"].add(pair['sentB_id'])
+        index = self.prepare_all()
+        exact, exact_ids = _pair_matches(index.rows_for("exact", doc_name), doc_name, "exact")
+        simhash, simhash_ids = _pair_matches(index.rows_for("simhash", doc_name), doc_name, "simhash", ("hamming",))
+        embedding, embedding_ids = _pair_matches(
+            index.rows_for("embedding", doc_name), doc_name, "embedding", ("cosine",)
+        )
         
         # Block matches
-        for block in self.get_block_matches():
-            if block['docA'] == doc_name:
-                result["blocks"].append({
-                    "other_doc": block['docB'],
-                    "start": block['A_start'],
-                    "end": block['A_end'],
-                    "other_start": block['B_start'],
-                    "other_end": block['B_end'],
-                    "length": block['len_sent']
-                })
-                # Add all sentences in block
-                for sid in range(block['A_start'], block['A_end'] + 1):
-                    result["duplicate_sentences"].add(sid)
-            elif block['docB'] == doc_name:
-                result["blocks"].append({
-                    "other_doc": block['docA'],
-                    "start": block['B_start'],
-                    "end": block['B_end'],
-                    "other_start": block['A_start'],
-                    "other_end": block['A_end'],
-                    "length": block['len_sent']
-                })
-                # Add all sentences in block
-                for sid in range(block['B_start'], block['B_end'] + 1):
-                    result["duplicate_sentences"].add(sid)
-        
-        # Convert set to sorted list
-        result["duplicate_sentences"] = sorted(list(result["duplicate_sentences"]))
-        
-        return result
+        blocks = []
+        starts = ends = np.empty(0, dtype=np.int64)
+        df = index.rows_for("blocks", doc_name)
+        if not df.empty:
+            m_a = df['docA'].values == doc_name
+            m_b = ~m_a & (df['docB'].values == doc_name)
+            rows = m_a | m_b
+            sub = df.loc[rows]
+            a_side = m_a[rows]
+            block_df = pd.DataFrame({
+                "other_doc": np.where(a_side, sub['docB'].values, sub['docA'].values),
+                "start": np.where(a_side, sub['A_start'].values, sub['B_start'].values),
+                "end": np.where(a_side, sub['A_end'].values, sub['B_end'].values),
+                "other_start": np.where(a_side, sub['B_start'].values, sub['A_start'].values),
+                "other_end": np.where(a_side, sub['B_end'].values, sub['A_end'].values),
+                "length": sub['len_sent'].values
+            })
+            blocks = block_df.to_dict('records')
+            
+            starts = block_df['start'].values
+            ends = block_df['end'].values
+        
+        return {
+            "exact": exact,
+            "simhash": simhash,
+            "embedding": embedding,
+            "blocks": blocks,
+            "duplicate_sentences": _duplicate_sentence_ids(
+                np.concatenate([exact_ids, simhash_ids, embedding_ids]), starts, ends
+            )
+        }
     
     def get_document_relationships(self, doc_name: str) -> List[Dict[str, Any]]:
         """
@@ -301,60 +479,32 @@ class DuplicateAnalyzer:
         Returns:
             List of related documents with match counts and overlap percentages
         """
-        # Count matches by document and type
-        relationships = defaultdict(lambda: {
-            'doc': '',
-            'exact_matches': 0,
-            'simhash_matches': 0,
-            'embedding_matches': 0,
-            'total_matches': 0
-        })
-        
-        # Count exact matches
-        for pair in self.get_exact_pairs():
-            if pair['docA'] == doc_name and pair['docB'] != doc_name:
-                relationships[pair['docB']]['doc'] = pair['docB']
-                relationships[pair['docB']]['exact_matches'] += 1
-            elif pair['docB'] == doc_name and pair['docA'] != doc_name:
-                relationships[pair['docA']]['doc'] = pair['docA']
-                relationships[pair['docA']]['exact_matches'] += 1
-        
-        # Count simhash matches
-        for pair in self.get_simhash_pairs():
-            if pair['docA'] == doc_name and pair['docB'] != doc_name:
-                relationships[pair['docB']]['doc'] = pair['docB']
-                relationships[pair['docB']]['simhash_matches'] += 1
-            elif pair['docB'] == doc_name and pair['docA'] != doc_name:
-                relationships[pair['docA']]['doc'] = pair['docA']
-                relationships[pair['docA']]['simhash_matches'] += 1
+        index = self.prepare_all()
+        counts = pd.concat({
+            'exact_matches': _count_partners(index.rows_for("exact", doc_name), doc_name),
+            'simhash_matches': _count_partners(index.rows_for("simhash", doc_name), doc_name),
+            'embedding_matches': _count_partners(index.rows_for("embedding", doc_name), doc_name)
+        }, axis=1, sort=False)
+        if counts.empty:
+            return []
         
-        # Count embedding matches
-        for pair in self.get_embedding_pairs():
-            if pair['docA'] == doc_name and pair['docB'] != doc_name:
-                relationships[pair['docB']]['doc'] = pair['docB']
-                relationships[pair['docB']]['embedding_matches'] += 1
-            elif pair['docB'] == doc_name and pair['docA'] != doc_name:
-                relationships[pair['docA']]['doc'] = pair['docA']
-                relationships[pair['docA']]['embedding_matches'] += 1
+        counts = counts.fillna(0).astype(int)
+        counts.index.name = 'doc'
+        counts['total_matches'] = counts.sum(axis=1)
         
-        # Calculate totals and percentages
-        metrics = {m['doc']: m for m in self.get_doc_metrics()}
-        current_doc_sentences = metrics.get(doc_name, {}).get('total_sentences', 1)
+        # Calculate overlap percentage based on current document's sentence count
+        metrics = self._metrics_df()
+        current = metrics.loc[metrics['doc'] == doc_name, 'total_sentences'] if not metrics.empty else []
+        current_doc_sentences = current.iloc[0] if len(current) else 1
+        if current_doc_sentences > 0:
+            counts['overlap_percentage'] = (counts['total_matches'] / current_doc_sentences * 100).round(2)
+        else:
+            counts['overlap_percentage'] = 0
         
-        result = []
-        for other_doc, counts in relationships.items():
-            total = counts['exact_matches'] + counts['simhash_matches'] + counts['embedding_matches']
-            counts['total_matches'] = total
-            
-            # Calculate overlap percentage based on current document's sentence count
-            counts['overlap_percentage'] = round((total / current_doc_sentences) * 100, 2) if current_doc_sentences > 0 else 0
-            
-            result.append(counts)
+        # Sort by total matches descending (stable, so ties keep first-seen order)
+        counts = counts.sort_values('total_matches', ascending=False, kind='stable')
         
-        # Sort by total matches descending
-        result.sort(key=lambda x: x['total_matches'], reverse=True)
-        
-        return result
+        return counts.reset_index().to_dict('records')
     
     def get_similarity_matrix(self) -> Dict[str, Dict[str, float]]:
         """
@@ -363,34 +513,31 @@ class DuplicateAnalyzer:
         Returns:
             Dict mapping docA -> docB -> similarity_score
         """
-        matrix = defaultdict(lambda: defaultdict(float))
-        
-        # Count matches between document pairs
-        match_counts = defaultdict(lambda: defaultdict(int))
-        
-        for pair in self.get_exact_pairs():
-            match_counts[pair['docA']][pair['docB']] += 1
-            match_counts[pair['docB']][pair['docA']] += 1
-        
-        for pair in self.get_simhash_pairs():
-            match_counts[pair['docA']][pair['docB']] += 1
-            match_counts[pair['docB']][pair['docA']] += 1
-        
-        for pair in self.get_embedding_pairs():
-            match_counts[pair['docA']][pair['docB']] += 1
-            match_counts[pair['docB']][pair['docA']] += 1
-        
-        # Get doc metrics for sentence counts
-        metrics = {m['doc']: m for m in self.get_doc_metrics()}
-        
-        # Calculate normalized similarity scores
-        for docA, targets in match_counts.items():
-            total_sents_A = metrics.get(docA, {}).get('total_sentences', 1)
-            for docB, count in targets.items():
-                total_sents_B = metrics.get(docB, {}).get('total_sentences', 1)
-                # Normalize by average document length
-                avg_sents = (total_sents_A + total_sents_B) / 2
-                matrix[docA][docB] = (count / avg_sents) * 100 if avg_sents > 0 else 0
+        frames = [df for df in self._pair_docs_dfs() if not df.empty]
+        if not frames:
+            return {}
+        
+        # Count matches between document pairs in both directions
+        all_pairs = pd.concat(frames, ignore_index=True)
+        symmetric = pd.concat(
+            [all_pairs, all_pairs.rename(columns={'docA': 'docB', 'docB': 'docA'})],
+            ignore_index=True
+        )
+        counts = symmetric.groupby(['docA', 'docB'], sort=False, observed=True).size()
+        
+        # Normalize by average document length (unknown documents count as 1 sentence)
+        metrics = self._metrics_df()
+        sentences = metrics.set_index('doc')['total_sentences'] if not metrics.empty else pd.Series(dtype='int64')
+        len_a = sentences.reindex(counts.index.get_level_values('docA')).fillna(1).values
+        len_b = sentences.reindex(counts.index.get_level_values('docB')).fillna(1).values
+        avg_sents = (len_a + len_b) / 2
+        scores = pd.Series(
+            np.where(avg_sents > 0, counts.values / np.where(avg_sents > 0, avg_sents, 1) * 100, 0),
+            index=counts.index
+        )
         
-        return dict(matrix)
-
+        # Nest the (docA, docB)-keyed scores only at the API boundary
+        matrix: Dict[str, Dict[str, float]] = {}
+        for (doc_a, doc_b), score in scores.to_dict().items():
+            matrix.setdefault(doc_a, {})[doc_b] = score
+        return matrix
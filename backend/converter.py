@@ -3,37 +3,60 @@ Document converter for .docx files with sentence-level tracking.
 Converts DOCX to HTML format with sentence IDs for highlighting.
 """
 
+import html
+import io
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 from pathlib import Path
 from zipfile import ZipFile
-from typing import List, Dict, Any
-import xml.etree.ElementTree as ET
+from typing import Iterable, List, Dict, Any, Optional
+
+W_TEXT_TAG = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t"
+
+try:
+    from lxml.etree import iterparse
+    _ITERPARSE_KW = {"tag": W_TEXT_TAG}  # lxml only reports <w:t> events, filtered in C
+except ImportError:
+    # lxml comes with python-docx; the stdlib parser is slower but equivalent here
+    from xml.etree.ElementTree import iterparse
+    _ITERPARSE_KW = {}
+
+# Patterns used per sentence, compiled once at import. corpus_dedup_runner.py keeps
+# its own copies; keep them in sync so sentence ids and tokens match the analysis.
+_WS = re.compile(r"\s+")
+_INLINE_WS = re.compile(r"[^\S\n]+")
+_NEWLINES = re.compile(r"[\r\n]+")
+_SENT = re.compile(r"(?<=[\.\!\?\:;])\s+")
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Smart quotes folded to ASCII in one str.translate pass
+_QUOTES = str.maketrans({"\u2018": "'", "\u2019": "'", "\u201c": '"', "\u201d": '"'})
 
 
 def read_docx_text(path: Path) -> str:
-    """Extract visible text from a .docx by parsing word/document.xml"""
+    """Extract visible text from a .docx by streaming <w:t> elements of word/document.xml"""
+    out = []
     with ZipFile(path) as z:
         with z.open("word/document.xml") as f:
-            xml = f.read().decode("utf-8", errors="ignore")
-    # Pull text inside <w:t>...</w:t>
-    out = []
-    for m in re.finditer(r"<w:t[^>]*>(.*?)</w:t>", xml, flags=re.S | re.I):
-        out.append(re.sub(r"\s+", " ", m.group(1)))
-    return "\n".join(out)
+            # The parsed tree is kept until the parse ends; only the text list is built up here
+            for _, el in iterparse(f, events=("end",), **_ITERPARSE_KW):
+                if el.tag == W_TEXT_TAG and el.text:
+                    out.append(el.text)
+    return _INLINE_WS.sub(" ", "\n".join(out))
 
 
+@lru_cache(maxsize=65536)
 def normalize_sentence(s: str) -> str:
-    """Normalize sentence for comparison."""
-    s = s.lower()
-    s = s.replace("\u2018", "'").replace("\u2019", "'").replace("\u201c", '"').replace("\u201d", '"')
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+    """Normalize sentence for comparison (memoized: boilerplate repeats across documents)."""
+    return _WS.sub(" ", s.lower().translate(_QUOTES)).strip()
 
 
 def sentence_split(text: str) -> List[str]:
     """Naive sentence split with extra break for overly long lines."""
-    t = re.sub(r"[\r\n]+", " ", text)
-    parts = re.split(r"(?<=[\.\!\?\:;])\s+", t)
+    t = _NEWLINES.sub(" ", text)
+    parts = _SENT.split(t)
     out = []
     for p in parts:
         p = p.strip()
@@ -48,9 +71,14 @@ def sentence_split(text: str) -> List[str]:
     return out
 
 
+@lru_cache(maxsize=65536)
+def _tokenize_tuple(s: str) -> tuple:
+    return tuple(_WORD.findall(s.lower()))
+
+
 def tokenize_words(s: str) -> List[str]:
     """Tokenize sentence into words."""
-    return re.findall(r"[a-z0-9]+", s.lower())
+    return list(_tokenize_tuple(s))
 
 
 def convert_docx_to_html(docx_path: Path, min_words: int = 8) -> Dict[str, Any]:
@@ -67,44 +95,73 @@ def convert_docx_to_html(docx_path: Path, min_words: int = 8) -> Dict[str, Any]:
     text = read_docx_text(docx_path)
     sentences_raw = sentence_split(text)
     
-    sentences = []
-    html_parts = []
-    sent_id = 0
-    
-    html_parts.append("<div class='document-content'>")
+    kept = []
+    buf = io.StringIO()
+    buf.write("<div class='document-content'>")
     
     for raw_sent in sentences_raw:
         norm = normalize_sentence(raw_sent)
         word_count = len(tokenize_words(norm))
+        escaped = html.escape(raw_sent, quote=False)
         
         # Only include sentences with enough words
         if word_count >= min_words:
-            sentences.append({
-                "id": sent_id,
-                "text": raw_sent,
-                "normalized": norm,
-                "word_count": word_count
-            })
-            
             # Create span with sentence ID
-            html_parts.append(
-                f'<span class="sentence" data-sentence-id="{sent_id}">{raw_sent}</span> '
-            )
-            sent_id += 1
+            buf.write('<span class="sentence" data-sentence-id="')
+            buf.write(str(len(kept)))
+            buf.write('">')
+            buf.write(escaped)
+            buf.write('</span> ')
+            kept.append((raw_sent, norm, word_count))
         else:
             # Include short sentences without tracking
-            html_parts.append(f'<span class="sentence-short">{raw_sent}</span> ')
+            buf.write('<span class="sentence-short">')
+            buf.write(escaped)
+            buf.write('</span> ')
+    
+    buf.write("</div>")
     
-    html_parts.append("</div>")
+    sentences = [
+        {"id": i, "text": raw, "normalized": norm, "word_count": wc}
+        for i, (raw, norm, wc) in enumerate(kept)
+    ]
     
     return {
         "filename": docx_path.name,
-        "html": "".join(html_parts),
+        "html": buf.getvalue(),
         "sentences": sentences,
         "total_sentences": len(sentences)
     }
 
 
+def convert_folder(
+    docx_paths: Iterable[Path],
+    min_words: int = 8,
+    workers: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Convert several DOCX files with convert_docx_to_html in worker processes.
+    
+    Conversion is CPU-bound pure Python, so processes (not threads) are used.
+    Each worker holds one decoded document at a time; peak memory grows with
+    the number of workers. Results are returned in the order of docx_paths.
+    """
+    docx_paths = list(docx_paths)
+    if not docx_paths:
+        return []
+    
+    workers = workers or os.cpu_count() or 1
+    # Batch several files per task so IPC overhead is amortized
+    chunksize = max(1, len(docx_paths) // (workers * 4))
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(
+            partial(convert_docx_to_html, min_words=min_words),
+            docx_paths,
+            chunksize=chunksize
+        ))
+
+
 def get_document_structure(docx_path: Path) -> Dict[str, Any]:
     """
     Extract document structure with headings and paragraphs.
@@ -2,6 +2,8 @@
 FastAPI backend for duplicate document detection system.
 """
 
+from anyio import to_thread
+from cachetools import LRUCache
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -9,12 +11,21 @@ from pydantic import BaseModel
 from pathlib import Path
 from typing import Optional, List, Dict, Any
 import json
+from contextlib import asynccontextmanager
 from datetime import datetime
 
 from analyzer import DuplicateAnalyzer
 from converter import convert_docx_to_html
 
-app = FastAPI(title="Duplicate Document Detection API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Allow more concurrent conversions/queries than anyio's default of 40 worker threads."""
+    to_thread.current_default_thread_limiter().total_tokens = 64
+    yield
+
+
+app = FastAPI(title="Duplicate Document Detection API", lifespan=lifespan)
 
 # Enable CORS for frontend
 app.add_middleware(
@@ -28,8 +39,8 @@ app.add_middleware(
 # Global analyzer instance
 analyzer = DuplicateAnalyzer(docs_dir="docs", output_dir="dedup_out")
 
-# In-memory cache for document conversions
-document_cache: Dict[str, Dict[str, Any]] = {}
+# In-memory cache for document conversions (bounded; each entry can be MBs of HTML)
+document_cache: LRUCache = LRUCache(maxsize=64)
 
 # Analysis status tracking
 analysis_status = {
@@ -80,15 +91,15 @@ async def get_analysis_status():
     }
 
 
-def run_analysis_task(request: AnalysisRequest):
-    """Background task to run analysis."""
+async def run_analysis_task(request: AnalysisRequest):
+    """Background task to run analysis (awaits the analyzer's worker process)."""
     global analysis_status
     
     analysis_status["running"] = True
     analysis_status["last_run"] = datetime.now().isoformat()
     
     try:
-        result = analyzer.run_analysis(
+        result = await analyzer.run_analysis_async(
             use_embeddings=request.use_embeddings,
             min_sentence_words=request.min_sentence_words,
             sim_hamming_strict=request.sim_hamming_strict,
@@ -140,7 +151,7 @@ async def get_documents(
     if not analyzer.has_results():
         raise HTTPException(status_code=404, detail="No analysis results found. Run analysis first.")
     
-    docs = analyzer.get_doc_metrics()
+    docs = await to_thread.run_sync(analyzer.get_doc_metrics)
     
     # Filter by minimum similarity
     docs = [d for d in docs if d.get('similarity_score', 0) >= min_similarity]
@@ -184,8 +195,8 @@ async def get_document_content(doc_name: str):
         raise HTTPException(status_code=400, detail="Only .docx files are supported")
     
     try:
-        # Convert document
-        result = convert_docx_to_html(doc_path)
+        # Convert document off the event loop
+        result = await to_thread.run_sync(convert_docx_to_html, doc_path)
         
         # Cache result
         document_cache[doc_name] = result
@@ -209,7 +220,7 @@ async def get_duplicates(doc_name: str, match_type: Optional[str] = None):
         raise HTTPException(status_code=404, detail="No analysis results found")
     
     try:
-        duplicates = analyzer.get_duplicates_for_doc(doc_name)
+        duplicates = await to_thread.run_sync(analyzer.get_duplicates_for_doc, doc_name)
         
         # Filter by match type if specified
         if match_type and match_type != "all":
@@ -241,7 +252,7 @@ async def get_highlights(doc_name: str):
         raise HTTPException(status_code=404, detail="No analysis results found")
     
     try:
-        duplicates = analyzer.get_duplicates_for_doc(doc_name)
+        duplicates = await to_thread.run_sync(analyzer.get_duplicates_for_doc, doc_name)
         
         # Build highlights mapping: sentence_id -> {type, docs, details}
         highlights = {}
@@ -319,7 +330,7 @@ async def get_similarity_matrix():
         raise HTTPException(status_code=404, detail="No analysis results found")
     
     try:
-        matrix = analyzer.get_similarity_matrix()
+        matrix = await to_thread.run_sync(analyzer.get_similarity_matrix)
         return {
             "matrix": matrix
         }
@@ -333,7 +344,7 @@ async def get_block_matches():
     if not analyzer.has_results():
         raise HTTPException(status_code=404, detail="No analysis results found")
     
-    blocks = analyzer.get_block_matches()
+    blocks = await to_thread.run_sync(analyzer.get_block_matches)
     return {
         "blocks": blocks,
         "total": len(blocks)
@@ -355,7 +366,7 @@ async def get_document_relationships(doc_name: str):
         raise HTTPException(status_code=404, detail="No analysis results found")
     
     try:
-        relationships = analyzer.get_document_relationships(doc_name)
+        relationships = await to_thread.run_sync(analyzer.get_document_relationships, doc_name)
         return {
             "relationships": relationships,
             "total": len(relationships)
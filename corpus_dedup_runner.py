@@ -13,66 +13,133 @@ Outputs:
 - summary.json
 
 Usage (examples):
-  pip install python-docx pandas numpy tqdm faiss-cpu sentence-transformers
+  pip install python-docx pandas numpy tqdm xxhash faiss-cpu sentence-transformers
   python corpus_dedup_runner.py --input_dir /path/to/docx --out_dir ./out --use_embeddings
   # SimHash only:
   python corpus_dedup_runner.py --input_dir /path/to/docx --out_dir ./out
 
 Notes:
 - Embeddings are optional. If not installed or --use_embeddings not passed, the embeddings stage is skipped.
-- SimHash here is implemented without external deps (64-bit, n-gram features).
+- SimHash here is implemented in NumPy (64-bit, n-gram features hashed with xxh3).
 """
 
-import argparse, re, json, math, hashlib
-from dataclasses import dataclass
-from itertools import combinations
+import argparse, re, json, math, os, sys, hashlib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, combinations
 from pathlib import Path
+from zipfile import ZipFile
 from collections import defaultdict, Counter
-from typing import List, Tuple, Dict, Iterable
+from functools import lru_cache, partial
+from typing import List, Tuple, Dict, Optional
 import numpy as np
 import pandas as pd
+import xxhash
 from tqdm import tqdm
 
+try:
+    from numba import njit, prange
+    HAVE_NUMBA = True
+except ImportError:  # optional: the LSH bucket scan falls back to NumPy
+    HAVE_NUMBA = False
+
 # ----------------------------- Text IO -----------------------------
 
-def read_docx_text(path: Path) -> str:
-    """Extract visible text from a .docx using python-docx library."""
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+W_P, W_R, W_T, W_TAB, W_BR, W_CR = (W_NS + t for t in ("p", "r", "t", "tab", "br", "cr"))
+
+try:
+    from lxml import etree
+    _ITERPARSE_KW = {"tag": W_P}  # lxml filters to <w:p> in C
+    _PRUNE_SIBLINGS = True  # lxml can also detach finished siblings from their parent
+except ImportError:
+    import xml.etree.ElementTree as etree
+    _ITERPARSE_KW = {}
+    _PRUNE_SIBLINGS = False
+
+def _paragraph_text(p) -> str:
+    """Text of one <w:p>, following python-docx (w:t, tabs and breaks of each run)."""
+    parts = []
+    for r in p.iter(W_R):
+        for child in r:
+            if child.tag == W_T:
+                parts.append(child.text or "")
+            elif child.tag == W_TAB:
+                parts.append("\t")
+            elif child.tag in (W_BR, W_CR):
+                parts.append("\n")
+    return "".join(parts)
+
+def _read_docx_text_python_docx(path: Path) -> str:
     from docx import Document
+    doc = Document(path)
+    
+    # Extract text from paragraphs
+    paragraphs = []
+    for para in doc.paragraphs:
+        text = para.text.strip()
+        if text:
+            paragraphs.append(text)
+    
+    # Extract text from tables
+    for table in doc.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                text = cell.text.strip()
+                if text:
+                    paragraphs.append(text)
     
+    return "\n".join(paragraphs)
+
+def read_docx_text(path: Path) -> str:
+    """Extract visible text from a .docx, one paragraph (body or table cell) per line in document order.
+
+    word/document.xml is streamed paragraph by paragraph and finished paragraphs are
+    dropped from the tree, so memory does not grow with document size; python-docx is
+    only used as a fallback if the streaming parse fails.
+    """
     try:
-        doc = Document(path)
-        
-        # Extract text from paragraphs
         paragraphs = []
-        for para in doc.paragraphs:
-            text = para.text.strip()
-            if text:
-                paragraphs.append(text)
-        
-        # Extract text from tables
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    text = cell.text.strip()
-                    if text:
-                        paragraphs.append(text)
-        
+        with ZipFile(path) as z, z.open("word/document.xml") as f:
+            for _, el in etree.iterparse(f, events=("end",), **_ITERPARSE_KW):
+                if el.tag != W_P:
+                    continue
+                text = _paragraph_text(el).strip()
+                if text:
+                    paragraphs.append(text)
+                # Emptied paragraphs are not revisited (e.g. text boxes nested in an outer <w:p>)
+                el.clear()
+                if _PRUNE_SIBLINGS:
+                    # Everything before this paragraph in its container is already consumed
+                    while el.getprevious() is not None:
+                        del el.getparent()[0]
         return "\n".join(paragraphs)
+    except Exception as e:
+        print(f"[WARN] Streaming read failed for {path}, falling back to python-docx: {e}")
     
+    try:
+        return _read_docx_text_python_docx(path)
     except Exception as e:
         print(f"Error reading {path}: {e}")
         return ""
 
+# Sentence splitting / normalization / tokenization. These mirror backend/converter.py
+# and must stay in sync with it: tokens, and so SimHash signatures, depend on both
+# modules normalizing text identically.
+_WS = re.compile(r"\s+")
+_NEWLINES = re.compile(r"[\r\n]+")
+_SENT = re.compile(r"(?<=[\.\!\?\:;])\s+")
+_WORD = re.compile(r"[a-z0-9]+")
+
+# \u2018 \u2019 \u201c \u201d -> ASCII quotes (same table as the converter)
+_QUOTES = str.maketrans({"\u2018": "'", "\u2019": "'", "\u201c": '"', "\u201d": '"'})
+
 def normalize_sentence(s: str) -> str:
-    s = s.lower()
-    s = s.replace("\u2018","'").replace("\u2019","'").replace("\u201c",'"').replace("\u201d",'"')
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+    return _WS.sub(" ", s.lower().translate(_QUOTES)).strip()
 
 def sentence_split(text: str) -> List[str]:
     """Naive sentence split with extra break for overly long lines."""
-    t = re.sub(r"[\r\n]+", " ", text)
-    parts = re.split(r"(?<=[\.\!\?\:;])\s+", t)
+    t = _NEWLINES.sub(" ", text)
+    parts = _SENT.split(t)
     out = []
     for p in parts:
         p = p.strip()
@@ -88,74 +155,270 @@ def sentence_split(text: str) -> List[str]:
 
 # ----------------------------- SimHash -----------------------------
 
-def md5_64(s: str) -> int:
-    h = hashlib.md5(s.encode("utf-8")).digest()
-    return int.from_bytes(h[:8], "big", signed=False)
+def _blake2b_64(b: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(b, digest_size=8).digest(), "big")
+
+def _md5_64(b: bytes) -> int:
+    return int.from_bytes(hashlib.md5(b).digest()[:8], "big")
+
+# 64-bit feature hashes (bytes -> int) for --hash; SimHash only needs uniform bits, so
+# non-cryptographic xxh3 is the fastest default. md5 reproduces signatures (and therefore
+# SimHash pairs) from outputs produced before the switch to xxh3.
+HASH_FUNCS = {"xxh3": xxhash.xxh3_64_intdigest, "blake2b": _blake2b_64, "md5": _md5_64}
 
 def tokenize_words(s: str) -> List[str]:
-    return re.findall(r"[a-z0-9]+", s.lower())
-
-def simhash_64(text: str, ngram: int = 3) -> int:
-    toks = tokenize_words(text)
-    feats = toks if len(toks) < ngram else [" ".join(toks[i:i+ngram]) for i in range(len(toks)-ngram+1)]
-    counts = Counter(feats)
-    V = [0]*64
-    for feat, w in counts.items():
-        hv = md5_64(feat)
-        for i in range(64):
-            if (hv >> i) & 1:
-                V[i] += w
-            else:
-                V[i] -= w
-    sig = 0
-    for i in range(64):
-        if V[i] >= 0:
-            sig |= (1<<i)
-    return sig
-
-def hamming(a: int, b: int) -> int:
-    return (a ^ b).bit_count()
-
-def bands_64(sig: int, bands=8, width=8) -> Iterable[Tuple[int,int]]:
-    for i in range(bands):
-        yield (i, (sig >> (i*width)) & ((1<<width)-1))
+    return _WORD.findall(s.lower())
+
+def token_shingles(toks: List[str], ngram: int = 3) -> List[str]:
+    return toks if len(toks) < ngram else [" ".join(toks[i:i+ngram]) for i in range(len(toks)-ngram+1)]
+
+def simhash_features(text: str, ngram: int = 3) -> List[str]:
+    return token_shingles(tokenize_words(text), ngram)
+
+def simhash_64_batch(features_per_sent: List[List[str]], hash_name: str = "xxh3") -> np.ndarray:
+    """SimHash a batch of feature lists at once; returns one uint64 signature each.
+
+    Bit i of the signature is set when the count-weighted +1/-1 vote of bit i over
+    the distinct features is >= 0 (same as the scalar definition).
+    """
+    n = len(features_per_sent)
+    counts = [Counter(feats) for feats in features_per_sent]
+    n_feats = np.fromiter((len(c) for c in counts), dtype=np.int64, count=n)
+    flat = [feat for c in counts for feat in c]
+    weights = np.fromiter((w for c in counts for w in c.values()), dtype=np.int64, count=len(flat))
+
+    V = np.zeros((n, 64), dtype=np.int64)
+    if flat:
+        hash_bytes = HASH_FUNCS[hash_name]
+        h = np.fromiter((hash_bytes(feat.encode("utf-8")) for feat in flat), dtype=np.uint64, count=len(flat))
+        # (n_features, 64) bit matrix, column i = bit i (LSB first)
+        bits = np.unpackbits(h.astype("<u8").view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+        votes = (bits.astype(np.int64) * 2 - 1) * weights[:, None]
+        # sum votes per sentence; sentences without features keep an all-zero row
+        has_feats = n_feats > 0
+        starts = np.cumsum(n_feats) - n_feats
+        V[has_feats] = np.add.reduceat(votes, starts[has_feats], axis=0)
+    sig_bits = (V >= 0).astype(np.uint8)
+    return np.packbits(sig_bits, axis=1, bitorder="little").view("<u8").ravel()
+
+def simhash_64(text: str, ngram: int = 3, hash_name: str = "xxh3") -> int:
+    return int(simhash_64_batch([simhash_features(text, ngram)], hash_name)[0])
+
+# ----------------------------- LSH bucket scan -----------------------------
+
+if HAVE_NUMBA:
+    _M1 = np.uint64(0x5555555555555555)
+    _M2 = np.uint64(0x3333333333333333)
+    _M4 = np.uint64(0x0F0F0F0F0F0F0F0F)
+    _H01 = np.uint64(0x0101010101010101)
+
+    @njit(cache=True)
+    def _popcount64(x):
+        # SWAR popcount on uint64 (all constants typed to stay in unsigned arithmetic)
+        x = x - ((x >> np.uint64(1)) & _M1)
+        x = (x & _M2) + ((x >> np.uint64(2)) & _M2)
+        x = (x + (x >> np.uint64(4))) & _M4
+        return (x * _H01) >> np.uint64(56)
+
+    @njit(parallel=True, cache=True)
+    def _scan_buckets_numba(items, offsets, sigs, max_ham):
+        n_buckets = len(offsets) - 1
+        # pass 1: count hits per bucket so each bucket gets its own output slice
+        counts = np.zeros(n_buckets, dtype=np.int64)
+        for k in prange(n_buckets):
+            c = 0
+            for i in range(offsets[k], offsets[k+1]):
+                si = sigs[items[i]]
+                for j in range(i+1, offsets[k+1]):
+                    if _popcount64(si ^ sigs[items[j]]) <= max_ham:
+                        c += 1
+            counts[k] = c
+        starts = np.zeros(n_buckets + 1, dtype=np.int64)
+        starts[1:] = np.cumsum(counts)
+        out_a = np.empty(starts[-1], dtype=np.int64)
+        out_b = np.empty(starts[-1], dtype=np.int64)
+        out_h = np.empty(starts[-1], dtype=np.int64)
+        # pass 2: fill
+        for k in prange(n_buckets):
+            pos = starts[k]
+            for i in range(offsets[k], offsets[k+1]):
+                ia = items[i]
+                for j in range(i+1, offsets[k+1]):
+                    ib = items[j]
+                    ham = _popcount64(sigs[ia] ^ sigs[ib])
+                    if ham <= max_ham:
+                        out_a[pos] = min(ia, ib)
+                        out_b[pos] = max(ia, ib)
+                        out_h[pos] = ham
+                        pos += 1
+        return out_a, out_b, out_h
+
+_POPCOUNT_U8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.int64)
+
+def popcount64(x: np.ndarray) -> np.ndarray:
+    """Element-wise popcount of a uint64 array (int64 result)."""
+    if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+        return np.bitwise_count(x).astype(np.int64)
+    # older NumPy: per-byte lookup table
+    return _POPCOUNT_U8[np.ascontiguousarray(x, dtype=np.uint64).view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+def _scan_buckets_np(items: np.ndarray, offsets: np.ndarray, sigs: np.ndarray, max_ham: int):
+    """NumPy counterpart of _scan_buckets_numba, batched over buckets of equal size."""
+    out_a, out_b, out_h = [], [], []
+    sizes = np.diff(offsets)
+    for m in np.unique(sizes).tolist():
+        # (n_buckets, m) member matrix; ids ascend along each row, so a < b below
+        members = items[offsets[:-1][sizes == m][:, None] + np.arange(m)]
+        i, j = np.triu_indices(m, 1)
+        a, b = members[:, i].ravel(), members[:, j].ravel()
+        ham = popcount64(sigs[a] ^ sigs[b])
+        keep = ham <= max_ham
+        out_a.append(a[keep]); out_b.append(b[keep]); out_h.append(ham[keep])
+    return np.concatenate(out_a), np.concatenate(out_b), np.concatenate(out_h)
+
+def lsh_buckets(sigs: np.ndarray, bands: int = 8, width: int = 8) -> Tuple[np.ndarray, np.ndarray]:
+    """Group sentence ids by (band, band value) of their signatures.
+
+    Band i of a signature is bits [i*width, (i+1)*width); two sentences share a bucket
+    when any band has the same value in both.
+
+    Returns (items, offsets): bucket k holds the ascending ids items[offsets[k]:offsets[k+1]].
+    Only buckets with two or more members are kept.
+    """
+    shifts = np.arange(bands, dtype=np.uint64) * np.uint64(width)
+    vals = (sigs[:, None] >> shifts) & np.uint64((1 << width) - 1)
+    # (N, bands) keys with the band index in the high bits, flattened row-major
+    keys = (vals.astype(np.int64) | (np.arange(bands, dtype=np.int64) << width)).ravel()
+    order = np.argsort(keys, kind="stable")  # stable keeps ids ascending within a bucket
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    sizes = np.diff(np.r_[starts, len(keys)])
+    keep = sizes > 1
+    items = (order // bands)[np.repeat(keep, sizes)]
+    offsets = np.zeros(int(keep.sum()) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(sizes[keep])
+    return items, offsets
+
+def lsh_candidate_pairs(sigs: np.ndarray, max_ham: int, bands: int = 8, width: int = 8) -> List[Tuple[int,int,int]]:
+    """All (a, b, hamming) with a < b sharing a bucket and hamming <= max_ham, sorted by (a, b)."""
+    sigs = np.asarray(sigs, dtype=np.uint64)
+    if len(sigs) < 2:
+        return []
+    items, offsets = lsh_buckets(sigs, bands, width)
+    if len(offsets) == 1:
+        return []
+    scan = _scan_buckets_numba if HAVE_NUMBA else _scan_buckets_np
+    a, b, ham = scan(items, offsets, sigs, max_ham)
+    # a pair sharing several bands shows up once per shared bucket
+    _, first = np.unique(a * len(sigs) + b, return_index=True)
+    return list(zip(a[first].tolist(), b[first].tolist(), ham[first].tolist()))
 
 # ----------------------------- Embeddings (optional) -----------------------------
 
-def embed_sentences(sentences: List[str], model_name: str):
-    """Return L2-normalized embeddings using sentence-transformers; falls back if unavailable."""
+@lru_cache(maxsize=2)
+def _get_model(model_name: str):
+    """Load a SentenceTransformer once per process (fp16 on CUDA); repeat runs reuse it."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    model = SentenceTransformer(model_name, device=device)
+    if device == "cuda":
+        model = model.half()
+    return model
+
+def embed_sentences(sentences: List[str], model_name: str, batch_size: int = 256):
+    """Return L2-normalized float32 embeddings using sentence-transformers; falls back if unavailable.
+
+    Runs in fp16 on CUDA when available; vectors are cast back to float32 for FAISS.
+    """
     try:
-        from sentence_transformers import SentenceTransformer
+        import torch
+        import sentence_transformers  # noqa: F401
     except Exception as e:
         raise RuntimeError("sentence-transformers not installed") from e
-    model = SentenceTransformer(model_name)
-    vecs = model.encode(sentences, convert_to_numpy=True, normalize_embeddings=True)
-    return vecs
+    model = _get_model(model_name)
+    with torch.inference_mode():
+        vecs = model.encode(sentences, batch_size=batch_size, convert_to_numpy=True,
+                            normalize_embeddings=True, show_progress_bar=True)
+    return vecs.astype(np.float32, copy=False)
 
-def build_faiss_index(vecs: np.ndarray):
+FAISS_SEARCH_BATCH = 4096
+
+def build_faiss_index(vecs: np.ndarray, kind: str = "auto"):
+    """Inner-product index over normalized vectors (i.e. cosine).
+
+    kind: "flat" (exact), "hnsw" (graph ANN), "ivfpq" (compressed ANN) or "auto",
+    which picks exact search for small corpora and ANN as the corpus grows.
+    """
     try:
         import faiss
     except Exception as e:
         raise RuntimeError("faiss-cpu not installed") from e
-    idx = faiss.IndexFlatIP(vecs.shape[1])  # cosine since normalized
+    n, d = vecs.shape
+    if kind == "auto":
+        kind = "flat" if n < 20_000 else ("hnsw" if n < 500_000 else "ivfpq")
+    if kind == "flat":
+        idx = faiss.IndexFlatIP(d)
+    elif kind == "hnsw":
+        idx = faiss.IndexHNSWFlat(d, 32, faiss.METRIC_INNER_PRODUCT)
+        idx.hnsw.efConstruction = 200
+        idx.hnsw.efSearch = 64
+    elif kind == "ivfpq":
+        quantizer = faiss.IndexFlatIP(d)
+        ivfpq = faiss.IndexIVFPQ(quantizer, d, int(4 * math.sqrt(n)), 16, 8, faiss.METRIC_INNER_PRODUCT)
+        ivfpq.train(vecs)
+        ivfpq.nprobe = 16
+        # PQ scores are too coarse for the cosine thresholds: fetch a 4x wider PQ shortlist
+        # and re-rank it with exact inner products
+        idx = faiss.IndexRefineFlat(ivfpq)
+        idx.k_factor = 4
+    else:
+        raise ValueError(f"Unknown faiss index kind: {kind}")
     idx.add(vecs)
     return idx
 
-# ----------------------------- Data Classes -----------------------------
-
-@dataclass
-class SentItem:
-    gid: int          # global sentence id
-    doc_id: int
-    doc_path: Path
-    sent_id: int
-    raw: str
-    norm: str
-    sig: int
-
 # ----------------------------- Runner -----------------------------
 
-def run(args):
+def process_doc(job: Tuple[int, Path], min_words: int, ngram: int, hash_name: str = "xxh3"
+                ) -> Tuple[int, List[int], List[str], List[str], np.ndarray]:
+    """Read, split, filter and SimHash one document.
+
+    Returns (doc_id, sent_ids, raws, norms, sigs) for the kept sentences. Each sentence
+    is tokenized once; the tokens serve both the length filter and the shingles.
+    Top-level so it can be shipped to ProcessPoolExecutor workers.
+    """
+    doc_id, path = job
+    text = read_docx_text(path)
+    sents = sentence_split(text)
+    sent_ids, raws, norms, features = [], [], [], []
+    for sid, s in enumerate(sents):
+        norm = normalize_sentence(s)
+        toks = tokenize_words(norm)
+        # filter short sentences
+        if len(toks) < min_words:
+            continue
+        sent_ids.append(sid)
+        raws.append(s)
+        norms.append(norm)
+        features.append(token_shingles(toks, ngram))
+    # SimHash the whole document's sentences in one vectorized batch
+    return doc_id, sent_ids, raws, norms, simhash_64_batch(features, hash_name)
+
+def run(input_dir, out_dir, use_embeddings: bool = False, **kw) -> Optional[dict]:
+    """Run the pipeline in-process and return the summary dict (None if no .docx found).
+
+    Keyword arguments mirror the CLI flags (e.g. ``min_sentence_words=8``);
+    anything not given falls back to the argparse defaults.
+    """
+    args = build_argparser().parse_args(["--input_dir", str(input_dir), "--out_dir", str(out_dir)])
+    args.use_embeddings = use_embeddings
+    for key, value in kw.items():
+        if not hasattr(args, key):
+            raise TypeError(f"Unknown runner option: {key}")
+        setattr(args, key, value)
+    return run_args(args)
+
+def run_args(args: argparse.Namespace) -> Optional[dict]:
     in_dir = Path(args.input_dir)
     out_dir = Path(args.out_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
@@ -164,170 +427,162 @@ def run(args):
     doc_paths = sorted([p for p in in_dir.rglob("*.docx") if p.is_file()])
     if not doc_paths:
         print("No .docx files found.")
-        return
+        return None
+    # resolved once; the writers look names up by doc_id (object array for fancy indexing)
+    doc_names = np.array([p.name for p in doc_paths], dtype=object)
 
     # 2) Extract sentences
-    all_items: List[SentItem] = []
-    total_tokens = []
-    gid = 0
-    for doc_id, p in enumerate(tqdm(doc_paths, desc="Reading DOCX")):
-        text = read_docx_text(p)
-        sents = sentence_split(text)
-        for sid, s in enumerate(sents):
-            norm = normalize_sentence(s)
-            # filter short sentences
-            if len(tokenize_words(norm)) < args.min_sentence_words:
-                continue
-            sig = simhash_64(norm, ngram=args.sim_ngram)
-            all_items.append(SentItem(gid, doc_id, p, sid, s, norm, sig))
-            gid += 1
-        total_tokens.append(sum(len(tokenize_words(s)) for s in sents))
-
-    n_sent = len(all_items)
+    work = partial(process_doc, min_words=args.min_sentence_words, ngram=args.sim_ngram, hash_name=args.hash)
+    jobs = enumerate(doc_paths)
+    workers = min(args.workers or os.cpu_count() or 1, len(doc_paths))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            results = list(tqdm(ex.map(work, jobs, chunksize=4), total=len(doc_paths), desc="Reading DOCX"))
+    else:
+        results = [work(job) for job in tqdm(jobs, total=len(doc_paths), desc="Reading DOCX")]
+    # Sentences are stored column-wise, indexed by global sentence id (gid). map() keeps
+    # submission order, so gids are assigned deterministically after the gather.
+    _, sid_lists, raw_lists, norm_lists, sig_arrays = zip(*results)
+    doc_ids = np.repeat(np.arange(len(doc_paths), dtype=np.int32), [len(x) for x in sid_lists])
+    sent_ids = np.fromiter(chain.from_iterable(sid_lists), dtype=np.int32, count=len(doc_ids))
+    raws: List[str] = list(chain.from_iterable(raw_lists))
+    # interned so repeated boilerplate shares one string (and one cached hash); done after
+    # the gather because strings unpickled from workers are fresh objects
+    norms: List[str] = [sys.intern(n) for n in chain.from_iterable(norm_lists)]
+    sigs = np.concatenate(sig_arrays).astype(np.uint64, copy=False)
+    # plain-list views for scalar lookups in the per-pair loops below
+    doc_of = doc_ids.tolist()
+    sid_of = sent_ids.tolist()
+
+    n_sent = len(doc_ids)
     print(f"Total sentences kept (>= {args.min_sentence_words} words): {n_sent}")
 
     # Build per-doc sentence counts
-    doc_n_sent = Counter([it.doc_id for it in all_items])
-
-    # 3) Exact sentence index
-    by_norm: Dict[str, List[int]] = defaultdict(list)
-    for idx, it in enumerate(all_items):
-        by_norm[it.norm].append(idx)
-
-    exact_pairs = set()
-    for norm, idxs in by_norm.items():
-        # cross-doc pairs only
-        if len(idxs) < 2:
-            continue
-        # group by doc
-        doc_groups = defaultdict(list)
-        for i in idxs:
-            doc_groups[all_items[i].doc_id].append(i)
-        docs = sorted(doc_groups.keys())
-        if len(docs) < 2:
-            continue
-        # make combinations across different docs
-        for da, db in combinations(docs, 2):
-            for ia in doc_groups[da]:
-                for ib in doc_groups[db]:
-                    a, b = (ia, ib) if ia < ib else (ib, ia)
-                    exact_pairs.add((a, b))
+    doc_n_sent = np.bincount(doc_ids, minlength=len(doc_paths))
+
+    # 3) Exact sentence index: group identical normalized sentences by sorting their hashes
+    norm_hash = np.fromiter(map(hash, norms), dtype=np.int64, count=n_sent)
+    order = np.argsort(norm_hash, kind="stable")  # stable keeps gids ascending within a run
+    bounds = np.flatnonzero(np.diff(norm_hash[order])) + 1
+    starts = np.concatenate(([0], bounds))
+    ends = np.concatenate((bounds, [n_sent]))
+    multi = ends - starts > 1
+
+    exact_a: List[int] = []
+    exact_b: List[int] = []
+    for start, end in zip(starts[multi].tolist(), ends[multi].tolist()):
+        groups = defaultdict(list)
+        for i in order[start:end].tolist():  # splits the rare hash collision apart
+            groups[norms[i]].append(i)
+        for idxs in groups.values():
+            # cross-doc pairs only; idxs are ascending, so a < b
+            for a, b in combinations(idxs, 2):
+                if doc_of[a] != doc_of[b]:
+                    exact_a.append(a)
+                    exact_b.append(b)
+    # (k, 2) array of (a, b) rows, sorted
+    exact_pairs = np.unique(np.column_stack([np.asarray(exact_a, dtype=np.int64),
+                                             np.asarray(exact_b, dtype=np.int64)]), axis=0)
 
     # 4) SimHash + LSH
-    buckets = defaultdict(list)
-    for idx, it in enumerate(all_items):
-        for key in bands_64(it.sig, bands=8, width=8):
-            buckets[key].append(idx)
-
-    sim_pairs = []  # (a,b,ham)
-    seen = set()
-    for _, idxs in buckets.items():
-        L = len(idxs)
-        if L > 1:
-            for i in range(L):
-                ia = idxs[i]; A = all_items[ia]
-                for j in range(i+1, L):
-                    ib = idxs[j]; B = all_items[ib]
-                    a, b = (ia, ib) if ia < ib else (ib, ia)
-                    if (a,b) in seen:
-                        continue
-                    ham = hamming(all_items[a].sig, all_items[b].sig)
-                    if ham <= args.sim_hamming_moderate:
-                        seen.add((a,b))
-                        sim_pairs.append((a,b,ham))
+    sim_pairs = lsh_candidate_pairs(sigs, args.sim_hamming_moderate, bands=8, width=8)  # (a,b,ham)
 
     # 5) Embeddings (optional)
     embed_pairs = []  # (a,b,cosine)
     if args.use_embeddings:
         try:
-            sents = [it.norm for it in all_items]
-            vecs = embed_sentences(sents, args.embed_model)
-            idx = build_faiss_index(vecs)
+            vecs = embed_sentences(norms, args.embed_model, batch_size=args.embed_batch_size)
+            idx = build_faiss_index(vecs, args.faiss_index)
             import faiss
-            D, I = idx.search(vecs, args.topk)
-            for i in range(n_sent):
-                A = all_items[i]
-                for j_idx, sim in zip(I[i][1:], D[i][1:]):
-                    if j_idx < 0: 
-                        continue
-                    B = all_items[j_idx]
-                    if sim >= args.embed_threshold_moderate:
-                        a, b = (i, int(j_idx)) if i < j_idx else (int(j_idx), i)
-                        embed_pairs.append((a,b,float(sim)))
-            # dedupe keep max sim
-            tmp = {}
-            for a,b,s in embed_pairs:
-                tmp[(a,b)] = max(s, tmp.get((a,b), 0.0))
-            embed_pairs = [(a,b,s) for (a,b),s in tmp.items()]
+            faiss.omp_set_num_threads(os.cpu_count() or 1)
+            # query in chunks so FAISS's per-search scratch buffers stay bounded
+            D = np.empty((n_sent, args.topk), dtype=np.float32)
+            I = np.empty((n_sent, args.topk), dtype=np.int64)
+            for start in range(0, n_sent, FAISS_SEARCH_BATCH):
+                stop = start + FAISS_SEARCH_BATCH
+                D[start:stop], I[start:stop] = idx.search(vecs[start:stop], args.topk)
+            rows = np.repeat(np.arange(n_sent, dtype=np.int64), I.shape[1])
+            cols = I.ravel().astype(np.int64)
+            sims = D.ravel().astype(np.float64)
+            # approximate indexes don't guarantee the query itself comes first
+            keep = (cols >= 0) & (cols != rows) & (sims >= args.embed_threshold_moderate)
+            a = np.minimum(rows, cols)[keep]
+            b = np.maximum(rows, cols)[keep]
+            if len(a):
+                # a pair found from both ends keeps its max similarity
+                key = a * n_sent + b
+                order = np.argsort(key, kind="stable")
+                uniq, first = np.unique(key[order], return_index=True)
+                best = np.maximum.reduceat(sims[keep][order], first)
+                embed_pairs = list(zip((uniq // n_sent).tolist(), (uniq % n_sent).tolist(), best.tolist()))
         except Exception as e:
             print(f"[WARN] Embeddings skipped: {e}")
 
-    # 6) Write sentence-level pairs
+    # 6) Write sentence-level pairs (DataFrames are built column-wise, one array per field)
+    def pair_columns(a: np.ndarray, b: np.ndarray, score_name: Optional[str] = None, scores=None) -> Dict[str, object]:
+        da, db = doc_ids[a], doc_ids[b]
+        cols = {"docA": doc_names[da], "sentA_id": sent_ids[a],
+                "textA": [raws[i][:240] for i in a.tolist()],
+                "docB": doc_names[db], "sentB_id": sent_ids[b],
+                "textB": [raws[i][:240] for i in b.tolist()]}
+        if score_name:
+            cols[score_name] = scores
+        cols["category"] = np.where(da == db, "within-document", "cross-document")
+        return cols
+
     def write_exact():
-        rows = []
-        for a,b in sorted(exact_pairs):
-            A = all_items[a]; B = all_items[b]
-            category = "within-document" if A.doc_id == B.doc_id else "cross-document"
-            rows.append({"docA": A.doc_path.name, "sentA_id": A.sent_id, "textA": A.raw[:240],
-                         "docB": B.doc_path.name, "sentB_id": B.sent_id, "textB": B.raw[:240],
-                         "category": category})
-        df = pd.DataFrame(rows)
+        df = pd.DataFrame(pair_columns(exact_pairs[:, 0], exact_pairs[:, 1]))
         df.to_csv(out_dir / "exact_sentence_pairs.csv", index=False)
         return df
 
     def write_simhash():
-        rows_strict, rows_moderate = [], []
-        for a,b,ham in sorted(sim_pairs, key=lambda x: (x[2], all_items[x[0]].doc_id, all_items[x[1]].doc_id)):
-            A = all_items[a]; B = all_items[b]
-            category = "within-document" if A.doc_id == B.doc_id else "cross-document"
-            row = {"docA": A.doc_path.name, "sentA_id": A.sent_id, "textA": A.raw[:240],
-                   "docB": B.doc_path.name, "sentB_id": B.sent_id, "textB": B.raw[:240], "hamming": ham,
-                   "category": category}
-            if ham <= args.sim_hamming_strict:
-                rows_strict.append(row)
-            rows_moderate.append(row)
-        pd.DataFrame(rows_strict).to_csv(out_dir / "simhash_sentence_pairs_strict.csv", index=False)
-        pd.DataFrame(rows_moderate).to_csv(out_dir / "simhash_sentence_pairs.csv", index=False)
-        return len(rows_strict), len(rows_moderate)
+        arr = np.array(sim_pairs, dtype=np.int64).reshape(-1, 3)
+        a, b, ham = arr[:, 0], arr[:, 1], arr[:, 2]
+        # stable, so ties keep the (a, b) order of sim_pairs
+        order = np.lexsort((doc_ids[b], doc_ids[a], ham))
+        df = pd.DataFrame(pair_columns(a[order], b[order], "hamming", ham[order]))
+        strict = df[df["hamming"].to_numpy() <= args.sim_hamming_strict]
+        strict.to_csv(out_dir / "simhash_sentence_pairs_strict.csv", index=False)
+        df.to_csv(out_dir / "simhash_sentence_pairs.csv", index=False)
+        return len(strict), len(df)
 
     def write_embeddings():
         if not embed_pairs:
             pd.DataFrame(columns=["docA","sentA_id","textA","docB","sentB_id","textB","cosine","category"]).to_csv(out_dir / "embed_sentence_pairs.csv", index=False)
             return 0,0
-        rows_strict, rows_moderate = [], []
-        for a,b,s in sorted(embed_pairs, key=lambda x: (-x[2], all_items[x[0]].doc_id, all_items[x[1]].doc_id)):
-            A = all_items[a]; B = all_items[b]
-            category = "within-document" if A.doc_id == B.doc_id else "cross-document"
-            row = {"docA": A.doc_path.name, "sentA_id": A.sent_id, "textA": A.raw[:240],
-                   "docB": B.doc_path.name, "sentB_id": B.sent_id, "textB": B.raw[:240], "cosine": round(s,4),
-                   "category": category}
-            if s >= args.embed_threshold_strict:
-                rows_strict.append(row)
-            if s >= args.embed_threshold_moderate:
-                rows_moderate.append(row)
-        pd.DataFrame(rows_strict).to_csv(out_dir / "embed_sentence_pairs_strict.csv", index=False)
-        pd.DataFrame(rows_moderate).to_csv(out_dir / "embed_sentence_pairs.csv", index=False)
-        return len(rows_strict), len(rows_moderate)
+        a = np.array([p[0] for p in embed_pairs], dtype=np.int64)
+        b = np.array([p[1] for p in embed_pairs], dtype=np.int64)
+        sim = np.array([p[2] for p in embed_pairs], dtype=np.float64)
+        order = np.lexsort((doc_ids[b], doc_ids[a], -sim))
+        a, b, sim = a[order], b[order], sim[order]
+        df = pd.DataFrame(pair_columns(a, b, "cosine", [round(x, 4) for x in sim.tolist()]))
+        strict = df[sim >= args.embed_threshold_strict]
+        moderate = df[sim >= args.embed_threshold_moderate]
+        strict.to_csv(out_dir / "embed_sentence_pairs_strict.csv", index=False)
+        moderate.to_csv(out_dir / "embed_sentence_pairs.csv", index=False)
+        return len(strict), len(moderate)
 
     exact_df = write_exact()
     n_sim_strict, n_sim_mod = write_simhash()
     n_emb_strict, n_emb_mod = write_embeddings()
 
     # 7) Merge into blocks (adjacent sentences aligned)
-    # Collect matches as (docA, sentA, docB, sentB)
+    # One pass over every sentence-level match collects both the block edges and the
+    # per-doc matched sentence ids used by the metrics in step 8
     edges = defaultdict(set)  # (docA, docB) -> set of (sentA, sentB)
-    def add_edge(a, b):
-        A = all_items[a]; B = all_items[b]
-        da, db = A.doc_id, B.doc_id
-        if da > db:
-            da, db = db, da
-            A, B = B, A
-        edges[(da,db)].add((A.sent_id, B.sent_id))
-
-    for a,b in exact_pairs: add_edge(a,b)
-    for a,b,_ in sim_pairs: 
-        if _ <= args.sim_hamming_moderate: add_edge(a,b)
-    for a,b,_ in embed_pairs: add_edge(a,b)
+    matched_sent_ids_by_doc = defaultdict(set)
+    def consume_pairs(pairs):
+        for a, b, *_ in pairs:
+            da, sa, db, sb = doc_of[a], sid_of[a], doc_of[b], sid_of[b]
+            matched_sent_ids_by_doc[da].add(sa)
+            matched_sent_ids_by_doc[db].add(sb)
+            if da > db:
+                da, db, sa, sb = db, da, sb, sa
+            edges[(da,db)].add((sa, sb))
+
+    consume_pairs(exact_pairs.tolist())
+    consume_pairs(sim_pairs)  # LSH already caps hamming at sim_hamming_moderate
+    consume_pairs(embed_pairs)
 
     block_rows = []
     per_doc_dup_sent = defaultdict(set)  # doc_id -> set(sent_id) that participate in any block/sentence match
@@ -346,12 +601,7 @@ def run(args):
                 j += 1
             run_len = (a1 - a0 + 1)
             if run_len >= args.block_min_run:
-                docA = doc_paths[da].name
-                docB = doc_paths[db].name
-                block_rows.append({
-                    "docA": docA, "A_start": a0, "A_end": a1, "len_sent": run_len,
-                    "docB": docB, "B_start": b0, "B_end": b1
-                })
+                block_rows.append((doc_names[da], a0, a1, run_len, doc_names[db], b0, b1))
                 # mark sentences as duplicated
                 for s in range(a0, a1+1):
                     per_doc_dup_sent[da].add(s)
@@ -359,34 +609,23 @@ def run(args):
                     per_doc_dup_sent[db].add(s)
             i = j
 
-    pd.DataFrame(block_rows).to_csv(out_dir / "block_matches.csv", index=False)
+    pd.DataFrame.from_records(block_rows, columns=["docA", "A_start", "A_end", "len_sent", "docB", "B_start", "B_end"]
+                              ).to_csv(out_dir / "block_matches.csv", index=False)
 
     # 8) Per-doc metrics
-    metrics = []
-    # build fast lookups for sentence-level hits (any match)
-    matched_sent_ids_by_doc = defaultdict(set)
-    def mark_pair(a,b):
-        A=all_items[a]; B=all_items[b]
-        matched_sent_ids_by_doc[A.doc_id].add(A.sent_id)
-        matched_sent_ids_by_doc[B.doc_id].add(B.sent_id)
-
-    for a,b in exact_pairs: mark_pair(a,b)
-    for a,b,_ in sim_pairs: mark_pair(a,b)
-    for a,b,_ in embed_pairs: mark_pair(a,b)
-
-    for doc_id, p in enumerate(doc_paths):
-        n_total = sum(1 for it in all_items if it.doc_id == doc_id)
-        n_matched = len(matched_sent_ids_by_doc.get(doc_id, set()))
-        n_block = len(per_doc_dup_sent.get(doc_id, set()))
-        metrics.append({
-            "doc": p.name,
-            "total_sentences": n_total,
-            "matched_sentences_any": n_matched,
-            "matched_sentences_pct": round(100.0 * n_matched / n_total, 2) if n_total else 0.0,
-            "in_block_sentences": n_block,
-            "in_block_sentences_pct": round(100.0 * n_block / n_total, 2) if n_total else 0.0,
-        })
-    pd.DataFrame(metrics).to_csv(out_dir / "doc_metrics.csv", index=False)
+    def pct(counts: List[int]) -> List[float]:
+        return [round(100.0 * c / n, 2) if n else 0.0 for c, n in zip(counts, doc_n_sent.tolist())]
+
+    n_matched = [len(matched_sent_ids_by_doc.get(doc_id, ())) for doc_id in range(len(doc_paths))]
+    n_block = [len(per_doc_dup_sent.get(doc_id, ())) for doc_id in range(len(doc_paths))]
+    pd.DataFrame({
+        "doc": doc_names,
+        "total_sentences": doc_n_sent,
+        "matched_sentences_any": n_matched,
+        "matched_sentences_pct": pct(n_matched),
+        "in_block_sentences": n_block,
+        "in_block_sentences_pct": pct(n_block),
+    }).to_csv(out_dir / "doc_metrics.csv", index=False)
 
     # 9) Summary
     summary = {
@@ -399,26 +638,33 @@ def run(args):
         "embed_pairs_strict": n_emb_strict,
         "block_matches": len(block_rows),
         "params": vars(args),
-        "docs": [p.name for p in doc_paths],
+        "docs": doc_names.tolist(),
     }
     (out_dir / "summary.json").write_text(json.dumps(summary, indent=2))
+    return summary
 
 def build_argparser():
     ap = argparse.ArgumentParser()
     ap.add_argument("--input_dir", required=True)
     ap.add_argument("--out_dir", required=True)
     ap.add_argument("--min_sentence_words", type=int, default=8)
+    ap.add_argument("--workers", type=int, default=None)  # DOCX ingest processes; default all cores
     ap.add_argument("--sim_ngram", type=int, default=3)
+    ap.add_argument("--hash", choices=sorted(HASH_FUNCS), default="xxh3")
     ap.add_argument("--sim_hamming_strict", type=int, default=6)
     ap.add_argument("--sim_hamming_moderate", type=int, default=8)
     ap.add_argument("--use_embeddings", action="store_true")
     ap.add_argument("--embed_model", default="sentence-transformers/all-MiniLM-L6-v2")
+    ap.add_argument("--embed_batch_size", type=int, default=256)
     ap.add_argument("--embed_threshold_strict", type=float, default=0.90)
     ap.add_argument("--embed_threshold_moderate", type=float, default=0.88)
     ap.add_argument("--topk", type=int, default=8)
+    ap.add_argument("--faiss_index", choices=["auto", "flat", "hnsw", "ivfpq"], default="auto")
     ap.add_argument("--block_min_run", type=int, default=2)
     return ap
 
+def main(argv: Optional[List[str]] = None) -> None:
+    run_args(build_argparser().parse_args(argv))
+
 if __name__ == "__main__":
-    parser = build_argparser()
-    run(parser.parse_args())
+    main()